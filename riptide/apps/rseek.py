@@ -132,13 +132,12 @@ def run_program(args):
 
     # Cluster peaks, i.e. for each period keep only the trial width
     # that yield the highest S/N
+    # NOTE: find_peaks() returns peaks in decreasing S/N order, which means
+    # that the brightest peak of a cluster is the one with the lowest index,
+    # and that sorting these indices yields clusters in decreasing S/N order
     freqs = np.asarray([p.freq for p in peaks])
     cluster_indices = cluster1d(freqs, r=args.clrad/ts.length)
-    peaks = [
-        max([peaks[ii] for ii in indices], key=lambda p: p.snr)
-        for indices in cluster_indices
-    ]
-    peaks = sorted(peaks, key=lambda p: p.snr, reverse=True)
+    peaks = [peaks[ii] for ii in sorted(indices.min() for indices in cluster_indices)]
 
     # DataFrame constructs from namedtuples nicely
     df = pandas.DataFrame(peaks)
@@ -34,18 +34,12 @@ def cluster1d(x, r, already_sorted=False):
 
     # NOTE: diff is the sequence of consecutive differences
     # of x AFTER it has been sorted
-    # Indices 
-    ibreaks = np.where(abs(diff) > r)[0]
+    # Indices of the last point of every cluster except the last one
+    ibreaks = np.flatnonzero(abs(diff) > r)
 
     # In this case, there is only one cluster
     if not len(ibreaks):
         return [indices]
 
-    # Cluster bounds indices
-    ibounds = np.concatenate(([0], ibreaks+1, [len(x)]))
-    
-    clusters = [
-        indices[start:end]
-        for start, end in zip(ibounds[:-1], ibounds[1:])
-    ]
-    return clusters
\ No newline at end of file
+    # Split the sorted indices at cluster boundaries in a single call
+    return np.split(indices, ibreaks + 1)
@@ -34,6 +34,15 @@ class Peak(typing.NamedTuple):
         return {a: getattr(self, a) for a in attrs}
 
 
+def num_segments(f, T, segwidth=5.0):
+    """
+    Number of frequency segments with a span of segwidth / T required to
+    cover the frequency trials 'f'. See segment_stats().
+    """
+    w = segwidth / T
+    return ceil(abs(f[-1] - f[0]) / w)
+
+
 def segment_stats(f, s, T, segwidth=5.0):
     """
     Cut a periodogram in consecutive, equal-sized segments with a 
@@ -46,8 +55,8 @@ def segment_stats(f, s, T, segwidth=5.0):
     Parameters
     -----------
     f : ndarray
-        Frequencies in Hz
-    S : ndarray
+        Frequencies in Hz, sorted in either increasing or decreasing order
+    s : ndarray
         Signal-to-noise ratios for a single width trial
     T : float
         Integration time in seconds
@@ -64,11 +73,8 @@ def segment_stats(f, s, T, segwidth=5.0):
         S/N standard deviation of the segments, measured from the interquartile
         range of the segment's S/N distribution (stddev = IQR / 1.349)
     """
-    w = segwidth / T
-    #log.debug("Segment width (Hz): {:.6f}".format(w))
-
     # NOTE: the spacing of frequency trials is almost constant
-    m = ceil(abs(f[-1] - f[0]) / w) # number of segments
+    m = num_segments(f, T, segwidth=segwidth)
     #log.debug("Segments: {:d}".format(m))
 
     p = len(f) // m # number of complete segments
@@ -78,7 +84,11 @@ def segment_stats(f, s, T, segwidth=5.0):
     f = f[:n]
     s = s[:n]
 
-    fc = np.median(f.reshape(m, p), axis=1)
+    # NOTE: f is sorted, so the median frequency of a segment is simply
+    # the middle element (or the mean of the two middle elements) of the
+    # segment, which avoids a partition of every segment
+    imid = slice((p - 1) // 2, p // 2 + 1)
+    fc = f.reshape(m, p)[:, imid].mean(axis=1)
     s25, smed, s75 = np.percentile(s.reshape(m, p), (25, 50, 75), axis=-1)
     sstd = (s75 - s25) / 1.349
     return fc, smed, sstd
@@ -108,32 +118,70 @@ def fit_threshold(fc, tc, polydeg=2):
     return np.poly1d(coeffs)
 
 
-def find_peaks_single(f, s, T, smin=6.0, segwidth=5.0, nstd=7.0, minseg=10, polydeg=2, clrad=0.1):
+def eval_threshold(polyco, logf, smin):
+    """
+    Evaluate the selection threshold max(poly(log(f)), smin), where 'poly' is
+    the polynomial with coefficients 'polyco' in decreasing powers, as used by
+    np.poly1d. This is equivalent but faster than calling np.poly1d, since
+    Horner's scheme is run in place on a single output array.
+
+    Parameters
+    ----------
+    polyco : ndarray or list
+        Polynomial coefficients in log(f), highest power first
+    logf : ndarray
+        Natural log of the frequencies in Hz
+    smin : float
+        Minimum value of the threshold
+
+    Returns
+    -------
+    thr : ndarray
+        Selection threshold for every frequency
+    """
+    thr = np.full_like(logf, polyco[0], dtype=float)
+    for c in polyco[1:]:
+        thr *= logf
+        thr += c
+    return np.maximum(thr, smin, out=thr)
+
+
+def find_peaks_single(f, s, T, smin=6.0, segwidth=5.0, nstd=7.0, minseg=10, polydeg=2, clrad=0.1, logf=None):
     """
     Find peaks in a single pulse width trial. Returns a list of array indices
-    that correspond to peak centres
+    that correspond to peak centres. 'logf' is the natural log of 'f', which
+    can be computed once by the caller when processing many width trials.
     """
     peak_indices = []
+    if logf is None:
+        logf = np.log(f)
 
-    # Control points
-    fc, smed, sstd = segment_stats(f, s, T, segwidth=segwidth)
-    sc = smed + nstd * sstd
-
-    # Selection threshold: polynomial in log(f)
-    if len(fc) >= minseg:
-        poly = fit_threshold(fc, sc, polydeg=polydeg)
-        polyco = poly.coefficients
+    # Selection threshold: polynomial in log(f) fitted to control points
+    static = num_segments(f, T, segwidth=segwidth) < minseg
+    if not static:
+        fc, smed, sstd = segment_stats(f, s, T, segwidth=segwidth)
+        sc = smed + nstd * sstd
+        polyco = fit_threshold(fc, sc, polydeg=polydeg).coefficients
     else: # constant threshold if not enough points for fit
         polyco = [smin]
-        poly = np.poly1d(polyco)
+
+    # The threshold is never lower than smin: if no S/N exceeds smin, there
+    # is nothing to find and the threshold does not need to be evaluated
+    if not np.nanmax(s) > smin:
+        return peak_indices, polyco
+
+    # NOTE: exceeding both the polynomial and smin is the same as exceeding
+    # the largest of the two, which saves one comparison and one temporary mask
+    # NOTE 2: with a static threshold, no need for an array, a scalar gets
+    # broadcast
+    thr = smin if static else eval_threshold(polyco, logf, smin)
 
     # Selected frequencies and frequency indices
-    dynthr = poly(np.log(f))
-    mask = (s > dynthr) & (s > smin)
-    indices = np.where(mask)[0]
+    indices = np.flatnonzero(s > thr)
     fsel = f[indices]
 
-    clusters = cluster1d(fsel, clrad / T)
+    # NOTE: f is sorted and 'indices' is increasing, so fsel is sorted too
+    clusters = cluster1d(fsel, clrad / T, already_sorted=True)
     for cl in clusters:
         ix = indices[cl]
         ipeak = s[ix].argmax()
@@ -193,30 +241,59 @@ def find_peaks(pgram, smin=6.0, segwidth=5.0, nstd=6.0, minseg=10, polydeg=2, cl
     f = pgram.freqs
     T = pgram.tobs
     dm = pgram.metadata['dm']
+    widths = np.asarray(pgram.widths)
+    foldbins = pgram.foldbins
+    # NOTE: pgram.snrs is float32, but peak selection is deliberately run
+    # in float64. Running it in float32 does not make it any faster, since
+    # its cost is dominated by the partitioning in segment_stats()
+    snrs = pgram.snrs
+
+    # Same for all width trials
+    logf = np.log(f)
 
-    peaks = []
+    # NOTE: Peak parameters are accumulated as parallel arrays, and Peak
+    # objects are only created once at the very end
+    # NOTE: start with empty arrays, so that concatenation also works when
+    # there are no width trials
+    ipeaks = [np.empty(0, dtype=int)]
+    iwidths = [np.empty(0, dtype=int)]
     polycos = {}
-    for iw, width in enumerate(pgram.widths):
-        s = pgram.snrs[:, iw].astype(float)
+    for iw in range(len(widths)):
+        s = snrs[:, iw].astype(float)
         cur_peak_indices, cur_polycos = find_peaks_single(
             f, s, T, 
-            smin=smin, segwidth=segwidth, nstd=nstd, minseg=minseg, polydeg=polydeg, clrad=clrad
+            smin=smin, segwidth=segwidth, nstd=nstd, minseg=minseg, polydeg=polydeg, clrad=clrad,
+            logf=logf
         )
-        for ipeak in cur_peak_indices:
-            peak_freq = f[ipeak]
-            peak_bins = pgram.foldbins[ipeak]
-            peak_ducy = float(width) / peak_bins
-
-            # NOTE: type enforcement is necessary, otherwise some Peak members
-            # have np.float32 type which causes trouble down the line
-            # NOTE 2: dm can be None on fake time series
-            peak = Peak(
-                freq=float(peak_freq), period=float(1.0/peak_freq), width=int(width), 
-                ducy=float(peak_ducy), iw=int(iw), ip=int(ipeak), snr=float(s[ipeak]), 
-                dm=dm)
-            #log.debug(peak)
-            peaks.append(peak)
+        ipeaks.append(np.asarray(cur_peak_indices, dtype=int))
+        iwidths.append(np.full(len(cur_peak_indices), iw, dtype=int))
         polycos[iw] = cur_polycos
-    
-    peaks = sorted(peaks, key=lambda p: p.snr, reverse=True)
+
+    ip = np.concatenate(ipeaks)
+    iw = np.concatenate(iwidths)
+
+    peak_freqs = f[ip]
+    peak_widths = widths[iw]
+    peak_ducys = peak_widths / foldbins[ip]
+    peak_snrs = snrs[ip, iw].astype(float)
+
+    # Sort by decreasing S/N; a stable sort keeps the same order as before
+    # for peaks with equal S/N
+    order = np.argsort(-peak_snrs, kind='stable')
+
+    # NOTE: tolist() converts to python types, otherwise some Peak members
+    # have np.float32 type which causes trouble down the line
+    # NOTE 2: dm can be None on fake time series
+    peaks = [
+        Peak(freq=pf, period=pp, width=pw, ducy=pd, iw=piw, ip=pip, snr=ps, dm=dm)
+        for pf, pp, pw, pd, piw, pip, ps in zip(
+            peak_freqs[order].tolist(),
+            (1.0 / peak_freqs[order]).tolist(),
+            peak_widths[order].tolist(),
+            peak_ducys[order].tolist(),
+            iw[order].tolist(),
+            ip[order].tolist(),
+            peak_snrs[order].tolist(),
+        )
+    ]
     return peaks, polycos
@@ -23,8 +23,8 @@ class Periodogram(object):
         which the data were folded for each particular trial period.
 
     snrs : ndarray
-        Two dimensional array with shape (num_periods, num_widths) containing the S/N as a function
-        of trial pulse width and period.
+        Two dimensional float32 array with shape (num_periods, num_widths) containing the S/N as a
+        function of trial pulse width and period.
     """
     def __init__(self, widths, periods, foldbins, snrs, metadata=None):
         self.widths = widths
@@ -2,6 +2,7 @@
 ##### Standard imports #####
 import os
 import struct
+import functools
 
 ##### Non-standard imports #####
 import numpy as np
@@ -64,24 +65,58 @@ sigproc_keydb = {
 HEADER_START = 'HEADER_START'
 HEADER_END = 'HEADER_END'
 
+# Number of bytes read from the file at a time when loading the header
+# The header is then parsed from memory, which avoids issuing many tiny reads
+HEADER_CHUNK_SIZE = 16384
 
+# Maximum number of bytes searched for the HEADER_END flag, to avoid reading
+# an entire large file that is not in SIGPROC format
+HEADER_MAX_SIZE = 1048576
 
-def read_str(fobj):
-    """ Read string from open binary file object. """
-    size, = struct.unpack('i', fobj.read(4))
-    # NOTE: reading a string in a binary file via fobj.read() returns
-    # a str in python2, but a bytes in python3. In python3 we need to called
-    # bytes.decode() to get a str, but in python2 calling decode() gives us
-    # a unicode object that must be cast to str again.
-    # The code below works with both python2 and python3.
-    return str(fobj.read(size).decode())
+# Pre-compiled decoders for the binary representation of non-string values
+_INT = struct.Struct('i')
+_DBL = struct.Struct('d')
+_UCHAR = struct.Struct('B')
 
+# {python type: decoder} for all supported non-string attribute types
+_DECODERS = {
+    int: _INT,
+    float: _DBL,
+    bool: _UCHAR,
+}
 
-def read_attribute(fobj, keydb):
-    """ Read SIGPROC {key, value} pair from open binary file object. """
-    key = read_str(fobj)
+
+def check_bounds(buf, offset, size):
+    """ Raise ValueError if 'size' bytes cannot be read from bytes-like buffer
+    starting at given offset. """
+    if size < 0 or offset + size > len(buf):
+        raise ValueError('SIGPROC header is truncated')
+
+
+def read_value(buf, offset, decoder):
+    """ Read value with given struct.Struct decoder from bytes-like buffer
+    starting at given offset. Returns the value and the offset of the first
+    byte that follows it. """
+    check_bounds(buf, offset, decoder.size)
+    val, = decoder.unpack_from(buf, offset)
+    return val, offset + decoder.size
+
+
+def read_str(buf, offset):
+    """ Read string from bytes-like buffer starting at given offset. Returns
+    the string and the offset of the first byte that follows it. """
+    size, offset = read_value(buf, offset, _INT)
+    check_bounds(buf, offset, size)
+    return bytes(buf[offset:offset+size]).decode(), offset + size
+
+
+def read_attribute(buf, offset, keydb):
+    """ Read SIGPROC {key, value} pair from bytes-like buffer starting at given
+    offset. Returns the key, the value and the offset of the first byte that
+    follows the pair. """
+    key, offset = read_str(buf, offset)
     if key == HEADER_END:
-        return key, None
+        return key, None, offset
 
     atype = keydb.get(key, None)
     if atype is None:
@@ -89,18 +124,64 @@ def read_attribute(fobj, keydb):
         raise KeyError(errmsg)
 
     if atype == str:
-        val = read_str(fobj)
-    elif atype == int:
-        val, = struct.unpack('i', fobj.read(4))
-    elif atype == float:
-        val, = struct.unpack('d', fobj.read(8))
-    elif atype == bool:
-        val, = struct.unpack('B', fobj.read(1)) # B = unsigned char
-        val = bool(val)
-    else:
-        errmsg = 'Key \'{0:s}\' has unsupported type \'{1:s}\''.format(key, atype)
+        val, offset = read_str(buf, offset)
+        return key, val, offset
+
+    decoder = _DECODERS.get(atype, None)
+    if decoder is None:
+        errmsg = 'Key \'{0:s}\' has unsupported type \'{1!s}\''.format(key, atype)
         raise ValueError(errmsg)
-    return key, val
+
+    val, offset = read_value(buf, offset, decoder)
+    return key, atype(val), offset
+
+
+# Cache of merged key databases {frozenset(extra_keys.items()): keydb}
+_KEYDB_CACHE = {}
+
+
+def get_keydb(extra_keys={}):
+    """ Returns the SIGPROC {key: type} database, updated with any
+    extra keys. Merged databases are cached and must not be modified. """
+    if not extra_keys:
+        return sigproc_keydb
+
+    cache_key = frozenset(extra_keys.items())
+    keydb = _KEYDB_CACHE.get(cache_key, None)
+    if keydb is None:
+        keydb = {**sigproc_keydb, **extra_keys}
+        _KEYDB_CACHE[cache_key] = keydb
+    return keydb
+
+
+def read_header_bytes(fobj):
+    """ Read the beginning of an open binary file object into memory, in
+    chunks of HEADER_CHUNK_SIZE bytes, until the HEADER_END flag has been
+    read. Raises ValueError if the file does not start with the HEADER_START
+    flag, or if no HEADER_END flag is found within the first HEADER_MAX_SIZE
+    bytes or before the end of the file. """
+    fobj.seek(0)
+    start = _INT.pack(len(HEADER_START)) + HEADER_START.encode()
+    chunk = fobj.read(len(start))
+    if chunk != start:
+        raise ValueError('File does not start with the expected \'{0:s}\' flag'.format(HEADER_START))
+
+    # NOTE: only search the latest chunk for the end flag, plus enough bytes
+    # before it in case the flag straddles two chunks
+    flag = HEADER_END.encode()
+    chunks = [chunk]
+    nbytes = len(chunk)
+    tail = b''
+    while flag not in tail + chunk:
+        if nbytes >= HEADER_MAX_SIZE:
+            raise ValueError('No \'{0:s}\' flag found in the first {1:d} bytes'.format(HEADER_END, HEADER_MAX_SIZE))
+        tail = (tail + chunk)[-(len(flag) - 1):]
+        chunk = fobj.read(HEADER_CHUNK_SIZE)
+        if not chunk:
+            raise ValueError('Reached end of file before finding the \'{0:s}\' flag'.format(HEADER_END))
+        chunks.append(chunk)
+        nbytes += len(chunk)
+    return b''.join(chunks)
 
 
 def read_sigproc_header(fobj, extra_keys={}):
@@ -121,48 +202,62 @@ def read_sigproc_header(fobj, extra_keys={}):
     bytesize : int
         Size of the header in bytes
     """
-    keydb = sigproc_keydb
-
     # Add any extra keys to header key database
-    if extra_keys:
-        keydb = sigproc_keydb.copy()
-        keydb.update(extra_keys)
+    keydb = get_keydb(extra_keys)
 
-    # Read HEADER_START flag
-    fobj.seek(0)
-    flag = read_str(fobj)
-    errmsg = 'File starts with \'{0:s}\' flag instead of the expected \'{1:s}\''.format(flag, HEADER_START)
-    assert flag == HEADER_START, errmsg
+    # Read the whole header in one go, then parse it from memory
+    buf = memoryview(read_header_bytes(fobj))
+
+    # Skip HEADER_START flag, already checked by read_header_bytes()
+    __, offset = read_str(buf, 0)
 
     # Read all header attributes
     attrs = {}
     while True:
-        key, val = read_attribute(fobj, keydb)
+        key, val, offset = read_attribute(buf, offset, keydb)
         if key == HEADER_END:
             break
         attrs[key] = val
 
-    return attrs, fobj.tell()
+    return attrs, offset
 
 
 def parse_float_coord(f):
     """ Parse coordinate in SIGPROC's own decimal floating point,
-    to either hours (RA) or degrees (Dec).
+    to either hours (RA) or degrees (Dec). 'f' can be either a scalar or
+    an array, e.g. the 'src_raj' values of many headers at once.
     """
+    f = np.asarray(f, dtype=np.float64)
     sign = np.sign(f)
-    x = abs(f)
-    hh, x = divmod(x, 10000.)
-    mm, ss = divmod(x, 100.)
+    x = np.abs(f)
+    hh, x = np.divmod(x, 10000.)
+    mm, ss = np.divmod(x, 100.)
     return sign * (hh + mm / 60.0 + ss / 3600.0)
 
 
+@functools.lru_cache(maxsize=1024)
+def read_sigproc_header_cached(fname, mtime_ns, size, extra_keys=frozenset()):
+    """ Read SIGPROC header from file, memoizing the result. 'mtime_ns' and
+    'size' should be taken from os.stat(fname): they are only used as part
+    of the cache key, so that a modified file gets parsed again. 'extra_keys'
+    must be given as a frozenset of (key, type) items.
+
+    Returns the same (header, bytesize) tuple as read_sigproc_header(). The
+    header dict is shared between all callers and must not be modified.
+    """
+    with open(fname, 'rb') as fobj:
+        return read_sigproc_header(fobj, dict(extra_keys))
+
+
 class SigprocHeader(dict):
     """ dict-like object wrapping the information carried by the header of a
     SIGPROC file. """
     def __init__(self, fname, extra_keys={}):
         self._fname = os.path.abspath(fname)
-        with open(self.fname, 'rb') as fobj:
-            (attrs, self._bytesize) = read_sigproc_header(fobj, extra_keys)
+        st = os.stat(self.fname)
+        (attrs, self._bytesize) = read_sigproc_header_cached(
+            self.fname, st.st_mtime_ns, st.st_size, frozenset(extra_keys.items()))
+        self._skycoord = None
         super(SigprocHeader, self).__init__(attrs)
 
     @property
@@ -191,7 +286,10 @@ class SigprocHeader(dict):
 
     @property
     def skycoord(self):
-        """ astropy.SkyCoord object with the coordinates of the source. """
-        rajd = parse_float_coord(self['src_raj'])
-        dejd = parse_float_coord(self['src_dej'])
-        return SkyCoord(rajd, dejd, unit=(uu.hour, uu.degree), frame='icrs')
+        """ astropy.SkyCoord object with the coordinates of the source.
+        Built on first access only. """
+        if self._skycoord is None:
+            rajd = parse_float_coord(self['src_raj'])
+            dejd = parse_float_coord(self['src_dej'])
+            self._skycoord = SkyCoord(rajd, dejd, unit=(uu.hour, uu.degree), frame='icrs')
+        return self._skycoord
@@ -25,16 +25,17 @@ def running_median(x, width_samples):
     The C++ running median code internally pads both ends of the arrray with
     the edge values.
 
-    If the input array is not contiguous in memory, a temporary contiguous copy
-    is made and passed to the C++ function (which only accepts C-contiguous
-    arrays). Otherwise no performance hit is incurred.
+    The C++ function only accepts C-contiguous float32 arrays. If the input
+    array is not contiguous in memory or has another dtype, a single temporary
+    contiguous float32 copy is made and passed to it. Otherwise no performance
+    hit is incurred.
 
     See Also
     --------
     fast_running_median : an approximate running median that runs much faster
         with large window sizes (> 100 elements).
     """
-    return riptide.libcpp.running_median(np.ascontiguousarray(x), width_samples)
+    return riptide.libcpp.running_median(np.ascontiguousarray(x, dtype=np.float32), width_samples)
 
 
 def scrunch(data, factor):
@@ -1,9 +1,11 @@
+import io
 import os
 import tempfile
 
 import numpy as np
 from pytest import raises, warns
 from riptide import TimeSeries, save_json, load_json
+import riptide.reading.sigproc as sigproc
 
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
@@ -61,6 +63,105 @@ def test_sigproc():
         ts = TimeSeries.from_sigproc(fname)
 
 
+def test_sigproc_header_chunked(monkeypatch):
+    """ Header must parse identically when read from disk in several chunks """
+    fname = os.path.join(DATA_DIR, 'fake_sigproc_float32.tim')
+    ref = sigproc.SigprocHeader(fname)
+
+    monkeypatch.setattr(sigproc, 'HEADER_CHUNK_SIZE', 7)
+    with open(fname, 'rb') as fobj:
+        attrs, bytesize = sigproc.read_sigproc_header(fobj)
+    assert attrs == dict(ref)
+    assert bytesize == ref.bytesize
+
+
+def test_sigproc_header_invalid(monkeypatch):
+    """ Files without a valid header must raise ValueError early """
+    fname = os.path.join(DATA_DIR, 'fake_sigproc_float32.tim')
+    with open(fname, 'rb') as fobj:
+        content = fobj.read()
+    iend = content.index(sigproc.HEADER_END.encode())
+
+    with tempfile.NamedTemporaryFile(suffix='.tim') as f:
+        # Not a SIGPROC file at all
+        with open(f.name, 'wb') as fobj:
+            fobj.write(np.random.bytes(100000))
+        with raises(ValueError):
+            sigproc.SigprocHeader(f.name)
+
+        # Truncated before the HEADER_END flag
+        with open(f.name, 'wb') as fobj:
+            fobj.write(content[:iend])
+        with raises(ValueError):
+            sigproc.SigprocHeader(f.name)
+
+        # HEADER_END flag lies beyond the maximum header size
+        monkeypatch.setattr(sigproc, 'HEADER_CHUNK_SIZE', 7)
+        monkeypatch.setattr(sigproc, 'HEADER_MAX_SIZE', iend // 2)
+        with open(fname, 'rb') as fobj, raises(ValueError):
+            sigproc.read_sigproc_header(fobj)
+
+    # Numeric value cut off by the end of the buffer
+    key = b'tsamp'
+    buf = np.int32(len(key)).tobytes() + key + bytes(3)
+    with raises(ValueError):
+        sigproc.read_attribute(buf, 0, sigproc.sigproc_keydb)
+
+
+def test_sigproc_header_cached():
+    """ Re-opening an unmodified file must not parse its header again """
+    fname = os.path.join(DATA_DIR, 'fake_sigproc_float32.tim')
+    ref = sigproc.SigprocHeader(fname)
+
+    hits = sigproc.read_sigproc_header_cached.cache_info().hits
+    sig = sigproc.SigprocHeader(fname)
+    assert sigproc.read_sigproc_header_cached.cache_info().hits == hits + 1
+    assert dict(sig) == dict(ref)
+    assert sig.bytesize == ref.bytesize
+
+    # Headers built from the cache must not share state
+    sig['source_name'] = 'modified'
+    assert sigproc.SigprocHeader(fname)['source_name'] == ref['source_name']
+
+
+def test_sigproc_extra_keys():
+    def encode_str(x):
+        return np.int32(len(x)).tobytes() + x.encode()
+
+    content = (
+        encode_str('HEADER_START')
+        + encode_str('num_trusses') + np.int32(42).tobytes()
+        + encode_str('HEADER_END')
+    )
+    extra_keys = {'num_trusses': int}
+    attrs, bytesize = sigproc.read_sigproc_header(io.BytesIO(content), extra_keys)
+    assert attrs == {'num_trusses': 42}
+    assert bytesize == len(content)
+
+    # Merged key database must be cached
+    keydb = sigproc.get_keydb(extra_keys)
+    assert keydb['num_trusses'] is int
+    assert sigproc.get_keydb({'num_trusses': int}) is keydb
+
+
+def test_sigproc_skycoord_cached():
+    fname = os.path.join(DATA_DIR, 'fake_sigproc_float32.tim')
+    sig = sigproc.SigprocHeader(fname)
+    assert sig.skycoord is sig.skycoord
+
+
+def test_sigproc_parse_float_coord():
+    """ Parsing an array of coordinates must match parsing each one alone """
+    coords = np.asarray([123456.78, -453405.0, 0.0, -1234.5, 235959.99, -895959.9])
+    parsed = sigproc.parse_float_coord(coords)
+    assert parsed.shape == coords.shape
+    for c, p in zip(coords, parsed):
+        assert p == sigproc.parse_float_coord(c)
+
+    # -45:34:05 in degrees
+    assert np.isclose(parsed[1], -(45 + 34 / 60.0 + 5 / 3600.0))
+
+
 def test_numpy_binary():
     refdata = np.arange(16)
     tsamp = 64e-6